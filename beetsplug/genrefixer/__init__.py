@@ -13,11 +13,19 @@ from beetsplug.genrefixer.command import GenreFixerCommand
 class TemplatePlugin(BeetsPlugin):
     _default_plugin_config_file_name_ = 'config_default.yml'
 
+    # Parsed once and shared between instantiations; the defaults file
+    # never changes at runtime so re-parsing the YAML per construction
+    # is wasted work.
+    _cached_default_config = None
+
     def __init__(self):
         super(TemplatePlugin, self).__init__()
         config_file_path = os.path.join(os.path.dirname(__file__),
                                         self._default_plugin_config_file_name_)
-        source = ConfigSource(load_yaml(config_file_path) or {},
+        if TemplatePlugin._cached_default_config is None:
+            TemplatePlugin._cached_default_config = \
+                load_yaml(config_file_path) or {}
+        source = ConfigSource(TemplatePlugin._cached_default_config,
                               config_file_path)
         self.config.add(source)
 
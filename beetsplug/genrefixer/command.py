@@ -1,7 +1,9 @@
 #  Copyright: Copyright (c) 2020., <AUTHOR>
 #  Author: <AUTHOR> <EMAIL>
 #  License: See LICENSE.txt
-import operator
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from optparse import OptionParser
 
 from beets.library import Library
@@ -13,6 +15,18 @@ from confuse import Subview
 
 from beetsplug.genrefixer import common
 
+# Compiled once at import time; RegexpQuery is immutable after
+# construction so the instances can be shared between invocations.
+_EMPTY_GENRE_QUERY = RegexpQuery('genre', '^$')
+_MULTI_GENRE_QUERY = RegexpQuery('genre', '[/,]')
+
+# Metadata fields (any one suffices) a query type needs to be worth
+# sending to a provider; also the set of known query types.
+_QTYPE_REQUIRED_META = {
+    'artist': ('artist', 'artistid'),
+    'album': ('album', 'albumid'),
+}
+
 
 class GenreFixerCommand(Subcommand):
     config: Subview = None
@@ -21,21 +35,40 @@ class GenreFixerCommand(Subcommand):
     parser: OptionParser = None
 
     dataproviders = None
+    provider_weights = None
+    type_weights = None
+    executor = None
+    query_cache = None
+
+    last_meta_key = None
+    last_unified_tags = None
 
-    _HATE_LIST_ = []
-    _DISLIKE_LIST_ = []
-    _LIKE_LIST_ = []
-    _LOVE_LIST_ = []
+    _HATE_LIST_ = frozenset()
+    _DISLIKE_LIST_ = frozenset()
+    _LIKE_LIST_ = frozenset()
+    _LOVE_LIST_ = frozenset()
 
     cfg_force = False
+    cfg_max_tags = None
+    cfg_tag_glue = None
+
+    query_types = ()
 
     def __init__(self, cfg):
         self.config = cfg
 
-        self._HATE_LIST_ = self.config["hate_list"].get()
-        self._DISLIKE_LIST_ = self.config["dislike_list"].get()
-        self._LIKE_LIST_ = self.config["like_list"].get()
-        self._LOVE_LIST_ = self.config["love_list"].get()
+        # Frozensets: membership tests in get_scored_tags are O(1)
+        # instead of scanning the configured lists per tag.
+        self._HATE_LIST_ = frozenset(self.config["hate_list"].get())
+        self._DISLIKE_LIST_ = frozenset(self.config["dislike_list"].get())
+        self._LIKE_LIST_ = frozenset(self.config["like_list"].get())
+        self._LOVE_LIST_ = frozenset(self.config["love_list"].get())
+
+        # These are static for the lifetime of the command; read them
+        # once instead of walking the config per item.
+        self.query_types = tuple(self.config["types"].keys())
+        self.cfg_max_tags = self.config["max_tags"].as_number()
+        self.cfg_tag_glue = self.config["tag_glue"].as_str()
 
         self.parser = OptionParser(
             usage='beet {plg} [options] [QUERY...]'.format(
@@ -82,138 +115,183 @@ class GenreFixerCommand(Subcommand):
         self.dataproviders = common.setup_dataproviders(
             self.config["providers"])
 
+        # Resolve the configured weights once; confuse walks the config
+        # tree on every as_number() call.
+        self.provider_weights = {
+            p: self.config["providers"][p]["weight"].as_number()
+            for p in self.config["providers"].keys()}
+        self.type_weights = {
+            t: self.config["types"][t]["weight"].as_number()
+            for t in self.config["types"].keys()}
+
+        # The provider queries are independent HTTP requests; one worker
+        # per (provider, qtype) pair overlaps their network latency.
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, len(self.dataproviders) *
+                            len(self.type_weights)))
+
+        # In-process memo of provider responses for this run; consecutive
+        # items of the same album/artist would otherwise repeat identical
+        # queries. Complements the providers' on-disk pickle cache.
+        self.query_cache = {}
+
     def shutdown_command(self):
+        self.executor.shutdown()
+
         # Shutdown dataproviders - saves cache
         for dp in self.dataproviders:
             dp.store_pickle_jar()
 
     def handle_main_task(self):
-        items = self.retrieve_library_items()
-        if not items:
+        # Iterate the Results object lazily instead of materializing the
+        # whole selection; peek at the first item to detect an empty set.
+        items = iter(self.retrieve_library_items())
+        first = next(items, None)
+        if first is None:
             self._say("Your query did not produce any results.", log_only=False)
             return
 
         last_album = None
-        for item in items:
-            if self.process_item(item):
-                item.try_write()
-                item.store()
-
-                # store genre on album as well
-                # current_album = item.get("mb_releasegroupid")
-                # if current_album != last_album:
-                #     album = item.get_album()
-                #     album["genre"] = item["genre"]
-                #     album.store()
-                #     last_album = current_album
+        # A single transaction turns the per-item store() autocommits
+        # into one SQLite commit at the end of the run.
+        with self.lib.transaction():
+            for item in chain([first], items):
+                if self.process_item(item):
+                    item.try_write()
+                    item.store()
+
+                    # store genre on album as well
+                    # current_album = item.get("mb_releasegroupid")
+                    # if current_album != last_album:
+                    #     album = item.get_album()
+                    #     album["genre"] = item["genre"]
+                    #     album.store()
+                    #     last_album = current_album
 
     def process_item(self, item: Item):
-        self._say("Fixing item: {}".format(item), log_only=True)
+        self._say("Fixing item: %s", item, log_only=True)
         current_genre = item.get("genre")
 
-        tag_groups = []
-
-        qtypes = (self.config["types"].keys())
+        qtypes = self.query_types
         metadata = {
             'artist': item.get("artist"),
-            'artistid': item.get("mb_artistid:"),
+            'artistid': item.get("mb_artistid"),
             'album': item.get("album"),
             'albumid': item.get("mb_releasegroupid"),
             'year': item.get("year")
         }
 
-        for dp in self.dataproviders:
-            # self._say("{}: {}".format("=" * 60, dp.name))
-            for qtype in qtypes:
-                tags = self.get_tags_from_provider(dp, qtype, metadata)
-                # self._say("tags[{}]: {}".format(qtype, tags), log_only=False)
-                if tags:
-                    tag_groups.append({
-                        'provider': dp.name,
-                        'qtype': qtype,
-                        'tags': tags
-                    })
-
-        # self._say("Tags: {}".format(tag_groups), log_only=False)
-
-        tags = self.create_unified_tag_list(tag_groups)
+        # Items arrive sorted by albumartist, so consecutive items of the
+        # same album/artist can reuse the previous unified tag list
+        # outright, without even consulting the query cache.
+        meta_key = (metadata['artist'], metadata['artistid'],
+                    metadata['album'], metadata['albumid'])
+        if meta_key == self.last_meta_key:
+            tags = dict(self.last_unified_tags)
+        else:
+            futures = []
+            for dp in self.dataproviders:
+                # self._say("{}: {}".format("=" * 60, dp.name))
+                pweight = self.provider_weights[dp.name.lower()]
+                for qtype in qtypes:
+                    weight = pweight * self.type_weights[qtype]
+                    cache_key = (dp.name, qtype) + meta_key
+                    if cache_key in self.query_cache:
+                        futures.append((weight, None, cache_key))
+                    else:
+                        futures.append((weight, self.executor.submit(
+                            self.get_tags_from_provider, dp, qtype, metadata),
+                            cache_key))
+
+            tags = {}
+            for weight, future, cache_key in futures:
+                if future is None:
+                    provider_tags = self.query_cache[cache_key]
+                else:
+                    provider_tags = self.query_cache[cache_key] = \
+                        future.result()
+                # No rounding while accumulating: scores are only ranked
+                # and logged, never persisted, so intermediate round()
+                # calls were pure overhead.
+                for k, v in provider_tags.items():
+                    tags[k] = tags.get(k, 0.0) + v * weight
+
+            self.last_meta_key = meta_key
+            # Keep a copy: get_scored_tags mutates the dict it is given.
+            self.last_unified_tags = dict(tags)
+
         # self._say("Unified Tags: {}".format(tags), log_only=False)
 
         tags = self.get_scored_tags(tags)
         # self._say("Scored Tags: {}".format(tags), log_only=False)
 
-        tags = sorted(tags.items(), key=operator.itemgetter(1), reverse=True)
-        self._say("Ordered Tags: {}".format(tags), log_only=False)
+        _max = self.cfg_max_tags
+        _glue = self.cfg_tag_glue
 
-        _max = self.config["max_tags"].as_number()
-        _glue = self.config["tag_glue"].as_str()
-        top_tags = [v[0] for v in tags][:_max]
+        # Only the top N tags are kept, so a partial selection is enough:
+        # O(N log k) instead of sorting the full tag dict. Iterating the
+        # keys with the dict's own lookup avoids building (k, v) tuples.
+        top_tags = heapq.nlargest(_max, tags, key=tags.__getitem__)
+        self._say("Ordered Tags: %s",
+                  [(k, round(tags[k], 3)) for k in top_tags], log_only=False)
         # self._say("Top Tags: {}".format(top_tags), log_only=False)
 
         changed = False
         if top_tags:
             new_genre = _glue.join(top_tags)
             if new_genre != current_genre:
-                self._say("Setting new genre: '{}' -> '{}'"
-                          .format(current_genre, new_genre), log_only=False)
+                self._say("Setting new genre: '%s' -> '%s'",
+                          current_genre, new_genre, log_only=False)
                 item["genre"] = new_genre
                 changed = True
 
         return changed
 
     def get_scored_tags(self, tags):
-
+        # Most tags are in none of the taste lists; those keep their
+        # score untouched instead of being multiplied by 1 and stored
+        # back.
         for k, v in tags.items():
-            m = 1
             if k in self._HATE_LIST_:
-                m = 0
+                tags[k] = 0
             elif k in self._DISLIKE_LIST_:
-                m = 0.5
+                tags[k] = v * 0.5
             elif k in self._LIKE_LIST_:
-                m = 1.5
+                tags[k] = v * 1.5
             elif k in self._LOVE_LIST_:
-                m = 3
-
-            n = round(v * m, 3)
-            # self._say("'{}': '{}' --(x{})--> {}".format(k,v,m,n))
-            tags[k] = n
+                tags[k] = v * 3
 
         return tags
 
-    def create_unified_tag_list(self, tag_groups):
-        ulist = {}
-        for tg in tag_groups:
-            provider = tg["provider"].lower()
-            pweight = self.config["providers"][provider]["weight"].as_number()
-            qtype = tg["qtype"].lower()
-            tweight = self.config["types"][qtype]["weight"].as_number()
-            tags = tg["tags"]
-            for k, v in tags.items():
-                v = v * pweight * tweight
-                # self._say("tag[{}]: {}".format(k, v), log_only=False)
-                if k in ulist:
-                    v = ulist[k] + v
-                ulist[k] = round(v, 3)
-
-        return ulist
-
-    def get_tags_from_provider(self, dp, qtype="album", metadata=None):
-        resp = []
+    def get_tags_from_provider(self, dp, qtype, metadata):
+        """Query one provider and return its normalized, formatted tags.
+
+        Runs on an executor worker; the weighted accumulation happens on
+        the collecting thread so the shared dict is never touched
+        concurrently.
+        """
+        required = _QTYPE_REQUIRED_META.get(qtype)
+        if required is None:
+            self._say("Unknown query type: %s", qtype, is_error=True)
+            return {}
+        if not any(metadata.get(f) for f in required):
+            return {}
+
+        dispatch = getattr(dp, '_dispatch', None)
+        if dispatch is None:
+            # Built on first use so lazy providers are not materialized
+            # before their first real query.
+            dispatch = dp._dispatch = {'artist': dp.query_artist,
+                                       'album': dp.query_album}
 
+        resp = []
         try:
-            if qtype == "artist":
-                resp = dp.query_artist(metadata)
-            elif qtype == "album":
-                resp = dp.query_album(metadata)
-            else:
-                self._say("Unknown query type: {}".format(qtype), is_error=True)
+            resp = dispatch[qtype](metadata)
         except NotImplementedError:
             pass
 
-        tags = common.get_normalized_tags(resp)
-        tags = {common.get_formatted_tag(k): v for k, v in tags.items()}
-
-        return tags
+        return {common.get_formatted_tag(k): v
+                for k, v in common.get_normalized_tags(resp).items()}
 
     def retrieve_library_items(self):
         cmd_query = self.query
@@ -224,12 +302,12 @@ class GenreFixerCommand(Subcommand):
             full_query = parsed_cmd_query
         else:
             parsed_plg_query = OrQuery([
-                RegexpQuery('genre', '^$'),
-                RegexpQuery('genre', '[/,]'),
+                _EMPTY_GENRE_QUERY,
+                _MULTI_GENRE_QUERY,
             ])
             full_query = AndQuery([parsed_cmd_query, parsed_plg_query])
 
-        self._say("Selection query: {}".format(full_query))
+        self._say("Selection query: %s", full_query)
 
         return self.lib.items(full_query, parsed_ordering)
 
@@ -241,5 +319,5 @@ class GenreFixerCommand(Subcommand):
         ), log_only=False)
 
     @staticmethod
-    def _say(msg, log_only=True, is_error=False):
-        common.say(msg, log_only, is_error)
+    def _say(msg, *args, log_only=True, is_error=False):
+        common.say(msg, *args, log_only=log_only, is_error=is_error)
@@ -3,30 +3,40 @@
 #  License: See LICENSE.txt
 
 import logging
-import os
+import threading
+from functools import lru_cache
 
 from confuse import Subview
-from beetsplug.genrefixer import dataprovider
+from beetsplug.genrefixer import about, dataprovider
 
 # Get values as: plg_ns['__PLUGIN_NAME__']
-plg_ns = {}
-about_path = os.path.join(os.path.dirname(__file__), u'about.py')
-with open(about_path) as about_file:
-    exec(about_file.read(), plg_ns)
+plg_ns = {k: v for k, v in vars(about).items()
+          if k.startswith('__') and k.endswith('__')}
 
 __logger__ = logging.getLogger('beets.{plg}'.format(
     plg=plg_ns['__PLUGIN_NAME__']))
 
 
-def say(msg, log_only=True, is_error=False):
+def say(msg, *args, log_only=True, is_error=False):
+    """Log `msg`, deferring %-style interpolation of `args`.
+
+    The enabled-level check comes first so callers on hot paths do not
+    pay for formatting (e.g. repr of an Item) that would be thrown away.
+    """
     _level = logging.DEBUG
     _level = _level if log_only else logging.INFO
     _level = _level if not is_error else logging.ERROR
-    __logger__.log(level=_level, msg=msg)
+    if __logger__.isEnabledFor(_level):
+        __logger__.log(_level, msg, *args)
 
 
+@lru_cache(maxsize=4096)
 def get_formatted_tag(tag):
-    """Format a tag to correct case."""
+    """Format a tag to correct case.
+
+    The same tags recur for every item in a library, so the (pure)
+    result is memoized across calls.
+    """
     words = tag.split(' ')
     for i, word in enumerate(words):
         if len(word) < 3:
@@ -37,21 +47,54 @@ def get_formatted_tag(tag):
 
 
 def get_normalized_tags(dp_response, _min=0.1):
-    tags = {}
-    if dp_response and len(dp_response) == 1 and 'tags' in dp_response[0]:
-        t = dp_response[0]["tags"]
-        if len(t):
-            _max = max(t.values())
-            if _max == 0:
-                score = 1
-                t = {it[0]: score / (i + 1) for i, it in
-                     enumerate(t.items())}
-                _max = max(t.values())
-
-            tags = {k: round(v / _max, 3) for k, v in t.items()
-                    if v / _max >= _min}
-
-    return tags
+    if not dp_response or len(dp_response) != 1 or 'tags' not in dp_response[0]:
+        return {}
+
+    t = dp_response[0]["tags"]
+    if not t:
+        return {}
+
+    _max = max(t.values())
+    if _max == 0:
+        score = 1
+        t = {it[0]: score / (i + 1) for i, it in enumerate(t.items())}
+        _max = max(t.values())
+
+    # Single pass: multiply by the reciprocal instead of dividing twice
+    # per tag and compare against the pre-scaled threshold.
+    inv_max = 1.0 / _max
+    threshold = _min * _max
+    return {k: round(v * inv_max, 3) for k, v in t.items() if v >= threshold}
+
+
+class LazyDataProvider:
+    """Proxy that defers dataprovider.factory() until first use.
+
+    Provider construction is not free (session setup, cache load, an
+    OAuth round-trip for Discogs) and an enabled provider is not
+    necessarily ever queried.
+    """
+
+    def __init__(self, name, conf):
+        self.name = name
+        self.conf = conf
+        self._dp = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        # The command layer queries artist and album concurrently, so
+        # first use can race; double-checked locking keeps exactly one
+        # provider instance (and its rate-limit state) per name.
+        if self._dp is None:
+            with self._lock:
+                if self._dp is None:
+                    self._dp = dataprovider.factory(self.name, self.conf)
+        return getattr(self._dp, attr)
+
+    def store_pickle_jar(self):
+        # Nothing to persist if the provider was never instantiated.
+        if self._dp is not None:
+            self._dp.store_pickle_jar()
 
 
 def setup_dataproviders(provider_config: Subview):
@@ -60,10 +103,13 @@ def setup_dataproviders(provider_config: Subview):
         try:
             pconf = provider_config[pk]
             if pconf["enabled"].get(bool):
-                say("Enabling DP({}): {}".format(pk, pconf))
-                providers.append(dataprovider.factory(pk, pconf))
+                if pk not in dataprovider.PROVIDERS:
+                    raise dataprovider.DataProviderError(
+                        'unknown dataprovider: {}'.format(pk))
+                say("Enabling DP(%s): %s", pk, pconf)
+                providers.append(LazyDataProvider(pk, pconf))
         except dataprovider.DataProviderError as err:
-            say('Data provider error: {}'.format(err))
+            say('Data provider error: %s', err)
 
     if not providers:
         raise RuntimeError(
@@ -26,56 +26,123 @@ import json
 import logging
 import os
 import os.path
+import sys
+import threading
 import time
-from collections import defaultdict
+from collections import Counter
 from configparser import NoSectionError, NoOptionError
 from datetime import timedelta
 import hashlib
 import pickle
 
 import requests
+from urllib3.util.retry import Retry
+
+try:
+    # Considerably faster than the stdlib decoder and accepts bytes
+    # directly, skipping the response's encoding detection.
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 from beetsplug.genrefixer.about import __PACKAGE_TITLE__, __version__
 
 HEADERS = {'User-Agent': '{}/{}'.format(__PACKAGE_TITLE__, __version__)}
 
+# Retry transient server errors with backoff instead of instantly
+# burning all attempts; shared by every mounted adapter.
+RETRIES = Retry(total=3, backoff_factor=0.3,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=frozenset(('GET', 'POST')))
+
 LASTFM_API_KEY = '591ad4cbbece4ab4562b26b16a47f6dd'
 
 DISCOGS_KEY = 'QjmavLUJaDliuMrmBxtS'
 DISCOGS_SECRET = 'rmzzSLnKAelpkuDhapIvEBVNWohYzBGI'
 
+# Discogs search result types that carry usable genre/style data.
+DISCOGS_TYPES = frozenset(('master', 'release'))
+
+# rauth is only needed for the Discogs OAuth flow; it is imported once,
+# on the first Discogs construction.
+rauth = None
+
+def _reqs_total(stats):
+    return stats['reqs_web'] + stats['reqs_cache'] + stats['reqs_lowcache']
+
+
+# Derived stats metrics as closures over the raw counters; a dict
+# lookup replaces the branch-and-string-parse ladder per key and makes
+# the key set explicit.
+DERIVED_STATS = {
+    'reqs_total': _reqs_total,
+    'results/req': lambda s: s['results'] / _reqs_total(s)
+    if _reqs_total(s) else None,
+    'tags/result': lambda s: s['tags'] / s['results']
+    if s['results'] else None,
+    'goodtags/tag': lambda s: s['goodtags'] / s['tags']
+    if s['tags'] else None,
+    'time_resp_avg': lambda s: s['time_resp'] / s['reqs_web']
+    if s['reqs_web'] else None,
+    'time_wait_avg': lambda s: s['time_wait'] / s['reqs_web']
+    if s['reqs_web'] else None,
+}
+
+# Upper bound on cached responses per jar; TTL expiry alone lets the
+# cache grow monotonically on large libraries.
+MAX_JAR_ENTRIES = 10000
+
+# Raw per-provider counters; derived metrics (reqs_total, */req, *_avg)
+# are computed from these on demand.
+STAT_KEYS = ('reqs_err', 'reqs_web', 'reqs_cache', 'reqs_lowcache',
+             'results', 'results_none', 'results_many',
+             'tags', 'goodtags', 'time_resp', 'time_wait')
+
+
+def _is_blank(value):
+    """True for metadata values that cannot produce a meaningful query."""
+    return not (value or '').strip()
+
+
+def _normalize_tag(tag):
+    """Normalize a raw tag name once, at the provider boundary.
+
+    Interning deduplicates the endlessly recurring genre strings
+    ('rock', 'electronic', ...) across responses and turns downstream
+    equality checks into pointer comparisons.
+    """
+    return sys.intern(tag.strip().lower())
+
 
 def factory(name, conf):
     """Factory for DataProviders."""
-    if name == 'discogs':
-        p = Discogs(conf)
-    elif name == 'lastfm':
-        p = LastFM(conf)
-    elif name == 'musicbrainz':
-        p = MusicBrainz(conf)
-    else:
+    cls = PROVIDERS.get(name)
+    if cls is None:
         raise DataProviderError('unknown dataprovider: %s' % name)
-    return p
+    return cls(conf)
+
+
+STATS_TABLE_KEYS = ('reqs_err', 'reqs_web', 'reqs_cache', 'reqs_lowcache',
+                    'results', 'results_none', 'results_many', 'results/req',
+                    'tags', 'tags/result', 'goodtags', 'goodtags/tag',
+                    'time_resp_avg', 'time_wait_avg')
 
 
 def get_stats(daprs):
     """Print some DataProvider statistics."""
-    result = ['\n', 'Source stats  ',
-              ''.join('| %-8s ' % d.name for d in daprs),
-              '\n', '-' * 14, ('+' + '-' * 10) * len(daprs),
-              '\n']
-    for key in ['reqs_err', 'reqs_web', 'reqs_cache', 'reqs_lowcache',
-                'results', 'results_none', 'results_many', 'results/req',
-                'tags', 'tags/result', 'goodtags', 'goodtags/tag',
-                'time_resp_avg', 'time_wait_avg']:
-        stats = [d.get_stats(key) for d in daprs]
+    header = 'Source stats  ' + ''.join('| %-8s ' % d.name for d in daprs)
+    separator = '-' * 14 + ('+' + '-' * 10) * len(daprs)
+    # One snapshot per provider: the derived metrics are computed in a
+    # single pass instead of once per table cell.
+    snapshots = [d.snapshot_stats() for d in daprs]
+    rows = []
+    for key in STATS_TABLE_KEYS:
+        stats = [s.get(key) for s in snapshots]
         if all(stats):
-            result.append('%-13s ' % key)
-            for val in stats:
-                pat = '| %8d ' if val.is_integer() else '| %8.2f '
-                result.append(pat % val)
-            result.append('\n')
-    return ''.join(result)
+            rows.append('%-13s ' % key + ''.join(
+                ('| %8d ' if val.is_integer() else '| %8.2f ') % val
+                for val in stats))
+    return '\n'.join(['', header, separator] + rows) + '\n'
 
 
 class DataProviderError(Exception):
@@ -83,45 +150,132 @@ class DataProviderError(Exception):
     pass
 
 
+class SharedCache:
+    """Single pickle-backed response cache shared by all DataProviders.
+
+    Cache ids embed the provider name, so one jar (and one in-memory
+    dict) serves every provider without collisions instead of loading,
+    bounding and writing three separate files per run.
+    """
+
+    def __init__(self):
+        self.cache = {}
+        self.validators = {}
+        self.loaded = False
+        self.unsaved = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_file_name():
+        _dir = os.environ['BEETSDIR'] if 'BEETSDIR' in os.environ else \
+            os.path.expanduser('~/.config/beets')
+        return os.path.join(_dir, 'dp-cache-shared.pickle')
+
+    def load(self):
+        with self._lock:
+            if self.loaded:
+                return
+            try:
+                with open(self.get_file_name(), 'rb') as f:
+                    jar = pickle.load(f)
+            except Exception as exc:
+                jar = {}
+
+            # Legacy jars were a bare cache dict; current ones also
+            # carry the HTTP validators for conditional requests.
+            if 'cache' not in jar:
+                jar = {'cache': jar}
+
+            # Entries are (timestamp, result) pairs; TTL expiry happens
+            # at read time against each provider's own TTL, but legacy-
+            # format entries are dropped here.
+            self.cache = {
+                cid: entry for cid, entry in jar['cache'].items()
+                if isinstance(entry, tuple) and len(entry) == 2}
+            self.validators = jar.get('validators', {})
+            self._evict_oldest()
+            self.loaded = True
+
+    def store(self):
+        # All mutators take the lock too, so the dicts cannot change
+        # size while pickle.dump iterates them.
+        with self._lock:
+            self._evict_oldest()
+            try:
+                with open(self.get_file_name(), 'wb') as f:
+                    pickle.dump({'cache': self.cache,
+                                 'validators': self.validators}, f)
+                self.unsaved = 0
+            except IOError as exc:
+                pass
+
+    def put(self, cid, entry):
+        with self._lock:
+            self.cache[cid] = entry
+            self.unsaved += 1
+            store_now = self.unsaved >= 33
+        if store_now:
+            self.store()
+
+    def put_validator(self, cid, val):
+        with self._lock:
+            # Stamp validators too; they carry full response bodies and
+            # are bounded by _evict_oldest like the cache entries.
+            val['ts'] = time.time()
+            self.validators[cid] = val
+            self.unsaved += 1
+            store_now = self.unsaved >= 33
+        if store_now:
+            self.store()
+
+    def _evict_oldest(self):
+        """Trim cache and validators to MAX_JAR_ENTRIES, oldest first."""
+        overflow = len(self.cache) - MAX_JAR_ENTRIES
+        if overflow > 0:
+            for cid in sorted(self.cache,
+                              key=lambda c: self.cache[c][0])[:overflow]:
+                del self.cache[cid]
+        # Validators written before timestamps existed sort as oldest.
+        overflow = len(self.validators) - MAX_JAR_ENTRIES
+        if overflow > 0:
+            for cid in sorted(
+                    self.validators,
+                    key=lambda c: self.validators[c].get('ts', 0))[:overflow]:
+                del self.validators[cid]
+
+
+shared_cache = SharedCache()
+
+
 class DataProvider(object):
     """Base class for DataProviders."""
     conf = None
 
     cache = {}
-    unsaved_in_jar = 0
+    validators = {}
 
     def __init__(self, conf):
         self.conf = conf
         self.log = logging.getLogger(__name__)
         self.name = self.__class__.__name__
         self.rate_limit = 1.0
+        self.cache_ttl = timedelta(days=90)
         self.last_request = 0
-        self.stats = defaultdict(float)
+        # The command layer queries providers from a thread pool;
+        # serialize requests per provider so rate_limit still holds.
+        self._rate_lock = threading.Lock()
+        self.stats = {key: 0.0 for key in STAT_KEYS}
         self.session = requests.Session()
         self._setup_session()
         self.open_pickle_jar()
 
     def open_pickle_jar(self):
-        self.unsaved_in_jar = 0
-        try:
-            with open(self.get_pickle_file_name(), 'rb') as f:
-                self.cache = pickle.load(f)
-        except Exception as exc:
-            self.cache = {}
+        shared_cache.load()
+        self.cache = shared_cache.cache
+        self.validators = shared_cache.validators
 
     def store_pickle_jar(self):
-        try:
-            with open(self.get_pickle_file_name(), 'wb') as f:
-                pickle.dump(self.cache, f)
-                self.unsaved_in_jar = 0
-        except IOError as exc:
-            pass
-
-    def get_pickle_file_name(self):
-        _dir = os.environ['BEETSDIR'] if 'BEETSDIR' in os.environ else \
-            os.path.expanduser('~/.config/beets')
-        return os.path.join(_dir,
-                            'dp-cache-{}.pickle'.format(self.name).lower())
+        shared_cache.store()
 
     def _get_cache_id(self, path, params):
         ck = "{}-{}-{}".format(self.name, path, json.dumps(params))
@@ -129,34 +283,54 @@ class DataProvider(object):
         return cid
 
     def _get_cached_data(self, cid):
-        res = None
-        if cid in self.cache:
-            res = self.cache[cid]
-            # print("Reusing cache({}): {}".format(cid, res))
-
+        entry = self.cache.get(cid)
+        if entry is None:
+            return None
+
+        ts, res = entry
+        if time.time() - ts > self.cache_ttl.total_seconds():
+            return None
+        # print("Reusing cache({}): {}".format(cid, res))
+
+        # Cache hits never reach _request, so they pay neither the
+        # rate-limit wait nor an HTTP round-trip; account for them here.
+        self.stats['reqs_cache'] += 1
         return res
 
     def _set_cached_data(self, cid, res):
         # print("Storing in cache({}): {}".format(cid, res))
-        self.cache[cid] = res
-        self.unsaved_in_jar += 1
-        if self.unsaved_in_jar == 33:
-            self.store_pickle_jar()
+        shared_cache.put(cid, (time.time(), res))
 
     def _setup_session(self):
         """Set session headers and mount HTTPAdapters with retries."""
-        self.session.headers.update(HEADERS)
-        adapter = requests.adapters.HTTPAdapter(max_retries=3)
+        self._apply_headers(self.session)
+        self._apply_retries(self.session)
+
+    @staticmethod
+    def _apply_headers(session):
+        session.headers.update(HEADERS)
+
+    @staticmethod
+    def _apply_retries(session):
+        """Mount adapters with retries and a sized connection pool.
+
+        The pool is sized for the command layer's thread fan-out so
+        concurrent requests reuse kept-alive connections instead of
+        paying a TLS handshake each.
+        """
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=4, pool_maxsize=16, max_retries=RETRIES)
         for prefix in ('http://', 'https://'):
-            self.session.mount(prefix, adapter)
+            session.mount(prefix, adapter)
 
     def _wait_rate_limit(self):
-        """Wait for the rate limit."""
-        while time.time() - self.last_request < self.rate_limit:
-            self.stats['time_wait'] += .1
-            time.sleep(.1)
+        """Wait out the remainder of the rate limit in a single sleep."""
+        delta = self.rate_limit - (time.monotonic() - self.last_request)
+        if delta > 0:
+            self.stats['time_wait'] += delta
+            time.sleep(delta)
 
-    def _request(self, url, params, method='GET'):
+    def _request(self, url, params, method='GET', headers=None):
         """Send a request.
 
         Honor rate limits and record some timings for stats.
@@ -164,66 +338,124 @@ class DataProvider(object):
         :param url: url string
         :param params: dict of call parameters
         :param method: request method
+        :param headers: extra per-request headers
         """
-        self._wait_rate_limit()
-        time_ = time.time()
-        try:
-            if method == 'POST':
-                res = self.session.post(url, data=params)
-            else:
-                res = self.session.get(url, params=params)
-        except requests.exceptions.TooManyRedirects as err:
-            raise err
-        except requests.exceptions.RequestException as err:
-            self.log.debug(err)
-            raise DataProviderError("request: %s" % err.message)
-        if not getattr(res, 'from_cache', False):
-            self.stats['reqs_web'] += 1
-            self.stats['time_resp'] += time.time() - time_
+        with self._rate_lock:
+            self._wait_rate_limit()
+            time_ = time.monotonic()
+            try:
+                if method == 'POST':
+                    res = self.session.post(url, data=params,
+                                            headers=headers)
+                else:
+                    res = self.session.get(url, params=params,
+                                           headers=headers)
+            except requests.exceptions.TooManyRedirects as err:
+                raise err
+            except requests.exceptions.ConnectionError as err:
+                self.log.debug(err)
+                self.stats['reqs_err'] += 1
+                raise DataProviderError("connection: %s" % err) from err
+            except requests.exceptions.RequestException as err:
+                self.log.debug(err)
+                self.stats['reqs_err'] += 1
+                raise DataProviderError("request: %s" % err) from err
+            # A 304 revalidation is accounted as a cache hit
+            # (reqs_lowcache) by _request_json; counting it here too
+            # would double it in reqs_total and skew time_resp_avg.
+            if res.status_code != 304:
+                self.stats['reqs_web'] += 1
+                self.stats['time_resp'] += time.monotonic() - time_
             self.last_request = time_
-        else:
-            self.stats['reqs_lowcache'] += 1
-        if res.status_code not in [200, 404]:
+        if res.status_code not in [200, 304, 404]:
             raise DataProviderError(
                 'status code %d: %s' % (res.status_code, res.reason))
         return res
 
     def _request_json(self, url, params, method='GET'):
-        """Return a json response from a request."""
-        res = self._request(url, params, method=method)
+        """Return a json response from a request.
+
+        GETs are sent conditionally when a validator (ETag or
+        Last-Modified) is known for the URL: a 304 answer reuses the
+        stored body instead of re-downloading the payload.
+        """
+        if method != 'GET':
+            return self._parse_json(self._request(url, params,
+                                                  method=method))
+
+        cid = self._get_cache_id(url, params)
+        val = self.validators.get(cid)
+        headers = None
+        if val:
+            headers = {}
+            if val.get('etag'):
+                headers['If-None-Match'] = val['etag']
+            if val.get('modified'):
+                headers['If-Modified-Since'] = val['modified']
+
+        res = self._request(url, params, headers=headers)
+        if res.status_code == 304 and val:
+            self.stats['reqs_lowcache'] += 1
+            return val['body']
+
+        body = self._parse_json(res)
+        etag = res.headers.get('ETag')
+        modified = res.headers.get('Last-Modified')
+        if etag or modified:
+            shared_cache.put_validator(cid, {'etag': etag,
+                                             'modified': modified,
+                                             'body': body})
+        return body
+
+    def _parse_json(self, res):
         try:
-            return res.json()
+            return json_loads(res.content)
         except ValueError as err:
             self.log.debug(res.text)
-            raise DataProviderError("json request: %s" % err.message)
+            raise DataProviderError("json request: %s" % err) from err
 
     def _prefilter_results(self, results, name, value, func):
-        """Try to prefilter results."""
-        res = [r for r in results if func(r) == value]
-        if res and len(res) < len(results):
+        """Try to prefilter results.
+
+        Streams `results` in a single pass, counting while matching, so
+        any iterable works and no second traversal is needed.
+        """
+        matched = []
+        allres = []
+        for res in results:
+            allres.append(res)
+            if func(res) == value:
+                matched.append(res)
+        if matched and len(matched) < len(allres):
             self.log.info('prefilter %d of %d results by %s',
-                          len(results) - len(res), len(results), name)
-            results = res
-        return results
+                          len(allres) - len(matched), len(allres), name)
+            return matched
+        return allres
+
+    def snapshot_stats(self):
+        """Return raw plus derived stats, computed in one pass."""
+        stats = dict(self.stats)
+        get = stats.get
+        reqs_total = (get('reqs_web', 0) + get('reqs_cache', 0) +
+                      get('reqs_lowcache', 0))
+        stats['reqs_total'] = reqs_total
+        if reqs_total:
+            stats['results/req'] = get('results', 0) / reqs_total
+        if get('results'):
+            stats['tags/result'] = get('tags', 0) / stats['results']
+        if get('tags'):
+            stats['goodtags/tag'] = get('goodtags', 0) / stats['tags']
+        if get('reqs_web'):
+            stats['time_resp_avg'] = get('time_resp', 0) / stats['reqs_web']
+            stats['time_wait_avg'] = get('time_wait', 0) / stats['reqs_web']
+        return stats
 
     def get_stats(self, key):
         """Return stats by key."""
-        value = None
         if key in self.stats:
-            value = self.stats[key]
-        elif key == 'reqs_total':
-            value = sum([self.stats['reqs_web'],
-                         self.stats['reqs_cache'],
-                         self.stats['reqs_lowcache']])
-        elif key == 'results/req' and self.get_stats('reqs_total'):
-            value = self.stats['results'] / self.get_stats('reqs_total')
-        elif key.startswith('time_') and self.stats['reqs_web']:
-            value = self.stats[key[:-3]] / self.stats['reqs_web']
-        elif key == 'tags/result' and self.stats['results']:
-            value = self.stats['tags'] / self.stats['results']
-        elif key == 'goodtags/tag' and self.stats['tags']:
-            value = self.stats['goodtags'] / self.stats['tags']
-        return value
+            return self.stats[key]
+        derive = DERIVED_STATS.get(key)
+        return derive(self.stats) if derive else None
 
     def query_artist(self, metadata):
         """Query for artist data."""
@@ -239,10 +471,14 @@ class Discogs(DataProvider):
 
     def __init__(self, conf):
         super(Discogs, self).__init__(conf)
-        import rauth
+        global rauth
+        if rauth is None:
+            import rauth
 
         # http://www.discogs.com/developers/#header:home-rate-limiting
         self.rate_limit = 3.0
+        # Search results are volatile; keep them fresh.
+        self.cache_ttl = timedelta(days=7)
         self.conf = conf
         self.discogs = rauth.OAuth1Service(
             consumer_key=DISCOGS_KEY,
@@ -261,7 +497,13 @@ class Discogs(DataProvider):
             exit(1)
 
         self.session = self.discogs.get_session(token)
-        self._setup_session()
+        self._apply_headers(self.session)
+        # Do not re-mount adapters here: that would replace rauth's
+        # OAuth-signing adapters and throw away their freshly opened
+        # connection pools. Only raise the retry policy on the mounted
+        # ones.
+        for prefix in ('http://', 'https://'):
+            self.session.get_adapter(prefix).max_retries = RETRIES
 
     def _get_token_from_config(self):
         """Get token from config file."""
@@ -287,7 +529,7 @@ class Discogs(DataProvider):
                 data={'oauth_verifier': oauth_verifier},
                 headers=HEADERS)
         except KeyError as err:
-            raise RuntimeError(err.message)
+            raise RuntimeError(str(err)) from err
         return token
 
     def _query(self, params):
@@ -301,12 +543,14 @@ class Discogs(DataProvider):
 
             res = []
             if result['results']:
-                tags = set()
-                for res in result['results']:
-                    if res['type'] in ['master', 'release']:
-                        for key in ['genre', 'style']:
-                            tags.update(res.get(key))
-                res = [{'tags': {tag: 0 for tag in tags}}]
+                # Single pass; `or ()` guards results that carry no
+                # genre/style key at all.
+                tags = {_normalize_tag(t)
+                        for r in result['results']
+                        if r.get('type') in DISCOGS_TYPES
+                        for key in ('genre', 'style')
+                        for t in (r.get(key) or ())}
+                res = [{'tags': dict.fromkeys(tags, 0)}]
 
             self._set_cached_data(cid, res)
 
@@ -320,6 +564,9 @@ class Discogs(DataProvider):
         """Query for album data."""
         artist = metadata["artist"]
         album = metadata["album"]
+        if _is_blank(album):
+            self.stats['reqs_err'] += 1
+            return []
         return self._query({'artist': artist, 'release_title': album})
 
 
@@ -330,6 +577,7 @@ class LastFM(DataProvider):
         super(LastFM, self).__init__(conf)
         # http://lastfm.de/api/tos
         self.rate_limit = .25
+        self.cache_ttl = timedelta(days=30)
 
     def _query(self, params):
         cid = self._get_cache_id("", params)
@@ -351,8 +599,13 @@ class LastFM(DataProvider):
                 if tags:
                     if not isinstance(tags, list):
                         tags = [tags]
-                    tags = {t['name']: int(t.get('count', 0)) for t in tags}
-                    res = [{'tags': tags}]
+                    # A Counter merges case variants collapsed by
+                    # _normalize_tag by summing their counts.
+                    counts = Counter()
+                    for t in tags:
+                        counts[_normalize_tag(t['name'])] += \
+                            int(t.get('count', 0))
+                    res = [{'tags': counts}]
                 else:
                     res = []
             self._set_cached_data(cid, res)
@@ -362,12 +615,18 @@ class LastFM(DataProvider):
     def query_artist(self, metadata):
         """Query for artist data."""
         artist = metadata["artist"]
+        if _is_blank(artist):
+            self.stats['reqs_err'] += 1
+            return []
         return self._query({'method': 'artist.gettoptags', 'artist': artist})
 
     def query_album(self, metadata):
         """Query for album data."""
         artist = metadata["artist"]
         album = metadata["album"]
+        if _is_blank(album):
+            self.stats['reqs_err'] += 1
+            return []
         return self._query({'method': 'album.gettoptags', 'album': album,
                             'artist': artist or 'Various Artists'
                             })
@@ -382,6 +641,18 @@ class MusicBrainz(DataProvider):
         # http://musicbrainz.org/doc/XML_Web_Service/Rate_Limiting
         self.rate_limit = 2.0
 
+    # How many mbids go into one batched search call; MusicBrainz caps
+    # search pages at 100 entities.
+    _MBID_BATCH_SIZE = 25
+
+    # Search-index id field per entity type.
+    _MBID_FIELDS = {
+        'artist': 'arid',
+        'release-group': 'rgid',
+        'release': 'reid',
+        'recording': 'rid',
+    }
+
     def _query(self, path, params):
         cid = self._get_cache_id(path, params)
         res = self._get_cached_data(cid)
@@ -389,7 +660,10 @@ class MusicBrainz(DataProvider):
         if res is None:
             # print("MB({}): ".format(cid))
             """Query MusicBrainz."""
-            params.update({'fmt': 'json', 'limit': 1})
+            # A search page of 100 entities costs the same rate-limit
+            # window as a single one.
+            params.setdefault('limit', 100)
+            params.update({'fmt': 'json'})
             result = self._request_json(
                 'http://musicbrainz.org/ws/2/' + path, params)
 
@@ -402,10 +676,16 @@ class MusicBrainz(DataProvider):
                 else:  # by mbid
                     result = [result]
 
-                res = [{'tags': {t['name']: int(t.get('count', 0))
-                                 for t in r.get('tags', {})}
-                        }
-                       for r in result]
+                res = []
+                for r in result:
+                    counts = Counter()
+                    for t in r.get('tags', {}):
+                        counts[_normalize_tag(t['name'])] += \
+                            int(t.get('count', 0))
+                    # Name and search score are kept so callers can
+                    # tell a real match from a loose homonym.
+                    res.append({'tags': counts, 'name': r.get('name'),
+                                'score': r.get('score')})
             self._set_cached_data(cid, res)
 
         return res
@@ -413,13 +693,52 @@ class MusicBrainz(DataProvider):
     def query_artist(self, metadata):
         """Query for artist data."""
         artist = metadata["artist"]
-        return self._query('artist', {'query': 'artist: ' + artist})
+        if _is_blank(artist):
+            self.stats['reqs_err'] += 1
+            return []
+        res = self._query('artist', {'query': 'artist: ' + artist})
+        # The page holds up to 100 candidates, but homonyms are common
+        # in the search index: only prefer a tagged candidate that is
+        # plausibly the queried artist (exact name or a perfect search
+        # score), otherwise stick with the best search match.
+        wanted = artist.strip().lower()
+        for r in res:
+            if not r['tags']:
+                continue
+            if ((r.get('name') or '').strip().lower() == wanted
+                    or r.get('score') == 100):
+                return [r]
+        return res[:1]
 
     def query_album(self, metadata):
         """Query for album data."""
         albumid = metadata["albumid"]
+        if _is_blank(albumid):
+            self.stats['reqs_err'] += 1
+            return []
         return self._query('release-group' + '/' + albumid, {'inc': 'tags'})
 
+    def query_by_mbids(self, entity, mbids):
+        """Query tags for several mbids of one entity type.
+
+        The search endpoint accepts OR'd id queries, so one round-trip
+        (and one rate-limit window) covers a whole chunk of mbids
+        instead of one request per id.
+        """
+        if entity == 'album':
+            entity = 'release-group'
+        idfield = self._MBID_FIELDS[entity]
+
+        res = []
+        mbids = list(mbids)
+        for i in range(0, len(mbids), self._MBID_BATCH_SIZE):
+            chunk = mbids[i:i + self._MBID_BATCH_SIZE]
+            query = ' OR '.join(
+                '{}:"{}"'.format(idfield, mbid) for mbid in chunk)
+            res.extend(self._query(entity, {'query': query, 'inc': 'tags',
+                                            'limit': len(chunk)}))
+        return res
+
     # def query_by_mbid(self, metadata):
     #     """Query by mbid."""
     #     entity = metadata["entity"]
@@ -428,3 +747,10 @@ class MusicBrainz(DataProvider):
     #     if entity == 'album':
     #         entity = 'release-group'
     #     return self._query(entity + '/' + mbid, {'inc': 'tags'})
+
+
+PROVIDERS = {
+    'discogs': Discogs,
+    'lastfm': LastFM,
+    'musicbrainz': MusicBrainz,
+}